@@ -1,57 +1,209 @@
 # job_script.py
 
-import time
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor, wait
+import orjson # Fast JSON decoder for the deployment watch stream
 import yaml # Import the yaml library
+try:
+    # Prefer libyaml's C loader; PyPI's manylinux PyYAML wheels ship with it
+    from yaml import CSafeLoader
+except ImportError:
+    from yaml import SafeLoader as CSafeLoader
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 from kubernetes import utils # Import utils for applying YAML
-from kubernetes.watch import Watch # Explicitly import Watch
+
+# Set up logging
+# Records are handed to a queue and written to stdout by a background QueueListener thread,
+# so the job's own threads (notably the deployment watcher) only enqueue and never wait on the
+# stdout write and flush themselves. Writing through sys.stdout keeps log lines in order with
+# anything else printed to it (library output, tracebacks).
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+_log_queue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_stream_handler = logging.StreamHandler(sys.stdout)
+_log_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop) # Drain any queued records before the interpreter exits
 
 # Load Kubernetes configuration
 # This will automatically detect if running inside a cluster (in-cluster config)
 # or outside (kubeconfig file).
+# The service account token is only mounted when running inside a pod, so its presence decides
+# which loader to use without having to attempt (and fail) the in-cluster one first.
+SERVICE_ACCOUNT_TOKEN_PATH = "/var/run/secrets/kubernetes.io/serviceaccount/token"
 try:
-    config.load_incluster_config()
-    print("Running in-cluster configuration.")
-except config.config_exception.ConfigException:
-    try:
+    if os.path.exists(SERVICE_ACCOUNT_TOKEN_PATH):
+        config.load_incluster_config()
+        log.info("Running in-cluster configuration.")
+    else:
         config.load_kube_config()
-        print("Running with kubeconfig file.")
-    except config.config_exception.ConfigException:
-        print("Could not load Kubernetes configuration. Exiting.")
-        exit(1)
-
-# Initialize Kubernetes API clients
-apps_v1 = client.AppsV1Api()
-core_v1 = client.CoreV1Api()
+        log.info("Running with kubeconfig file.")
+except config.config_exception.ConfigException:
+    log.error("Could not load Kubernetes configuration. Exiting.")
+    exit(1)
 
 # Define the namespace where the resources will be created/deleted
 NAMESPACE = "default"
 # Path to the combined YAML file inside the container
 RESOURCES_YAML_PATH = "hellowhale.yml"
-WAIT_SECONDS = 60
+# Availability check after readiness: number of status polls, and the base delay between them (jittered)
+SETTLE_MAX_ATTEMPTS = 6
+SETTLE_RETRY_SECONDS = 5
+# How long to wait for the deployment to become ready (10 minutes)
+WATCH_TIMEOUT_SECONDS = 600
+# Upper bound on concurrent create requests sent to the API server
+MAX_CREATE_WORKERS = 16
+
+# Initialize Kubernetes API clients
+# A single ApiClient is shared by every API call, so all requests reuse one keep-alive
+# urllib3 connection pool (and TLS session) instead of handshaking per resource.
+# The pool is sized so that concurrent creates don't block waiting for a connection.
+api_client_configuration = client.Configuration.get_default_copy()
+api_client_configuration.connection_pool_maxsize = MAX_CREATE_WORKERS
+api_client = client.ApiClient(api_client_configuration)
+
+def _close_api_client():
+    """
+    Closes the shared ApiClient's connections. ApiClient.close() only tears down the async_req
+    thread pool (never created here), so the urllib3 PoolManager is cleared explicitly as well.
+    """
+    api_client.close()
+    api_client.rest_client.pool_manager.clear()
+
+atexit.register(_close_api_client) # Release pooled connections on any normal interpreter exit
+
+apps_v1 = client.AppsV1Api(api_client)
+core_v1 = client.CoreV1Api(api_client)
+
+# Server-side apply endpoint and response model for each resource kind this job manages;
+# the kind is already known from the manifest
+APPLY_ENDPOINTS = {
+    'Deployment': ('/apis/apps/v1/namespaces/{namespace}/deployments/{name}', 'V1Deployment'),
+    'Service': ('/api/v1/namespaces/{namespace}/services/{name}', 'V1Service'),
+}
+# Field manager recorded by the API server for fields set through server-side apply
+FIELD_MANAGER = "job-dep-create-delete"
+
+# Delete call and options for each supported resource kind, built once at start-up
+DELETE_DISPATCH = {
+    # Background propagation returns as soon as the Deployment is deleted;
+    # the garbage collector removes its ReplicaSets and Pods asynchronously.
+    'Deployment': (apps_v1.delete_namespaced_deployment,
+                   client.V1DeleteOptions(propagation_policy="Background", grace_period_seconds=5)),
+    'Service': (core_v1.delete_namespaced_service,
+                client.V1DeleteOptions(propagation_policy="Foreground", grace_period_seconds=5)),
+}
+
+# Watch event paths that the readiness check needs, and the keys they are stored under.
+# Every other field of the decoded event is dropped as soon as the line is parsed.
+WATCH_EVENT_FIELDS = {
+    ('type',): 'type',
+    ('object', 'code'): 'code', # Only present on ERROR events, whose object is a Status
+    ('object', 'metadata', 'resourceVersion'): 'resource_version',
+    ('object', 'metadata', 'generation'): 'generation',
+    ('object', 'spec', 'replicas'): 'replicas',
+    ('object', 'status', 'readyReplicas'): 'ready_replicas',
+    ('object', 'status', 'observedGeneration'): 'observed_generation',
+}
+# Read size for the raw watch stream
+WATCH_CHUNK_SIZE = 4096
 
 # Global list to store the names and kinds of resources successfully created by this job
 # This helps in knowing what to delete later.
 created_resources_info = [] # Format: [{'kind': 'Deployment', 'name': 'hello-blue-whale'}, {'kind': 'Service', 'name': 'hello-whale-svc'}]
+# Guards created_resources_info while resources are created from worker threads
+created_resources_lock = threading.Lock()
+# Readiness watch for the job's Deployment, opened before that Deployment is created (see start_deployment_watch)
+# Format: {'name': ..., 'thread': ..., 'cond': ..., 'stop_event': ..., 'response': ..., 'latest': ..., 'min_generation': ..., 'done': ...}
+deployment_watch = None
+
+def _track_created_resource(kind, name):
+    """
+    Records a resource in created_resources_info for later deletion.
+    """
+    with created_resources_lock:
+        created_resources_info.append({'kind': kind, 'name': name})
+
+def _apply_resource(manifest, kind, name):
+    """
+    Creates or updates a single resource with server-side apply, in one request regardless of
+    whether it already exists, and returns the applied object.
+    """
+    # The generated patch_namespaced_* methods can't send the apply-patch+yaml content type,
+    # so the request is made directly. The manifest dict is sent as JSON, which is valid YAML.
+    resource_path, response_type = APPLY_ENDPOINTS[kind]
+    return api_client.call_api(
+        resource_path, 'PATCH',
+        path_params={'namespace': NAMESPACE, 'name': name},
+        query_params=[('fieldManager', FIELD_MANAGER), ('force', 'true')],
+        header_params={'Content-Type': 'application/apply-patch+yaml', 'Accept': 'application/json'},
+        body=manifest,
+        response_type=response_type,
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True,
+    )
+
+def _create_resource(manifest, kind, name):
+    """
+    Creates a single resource from its manifest and records it in created_resources_info.
+    Runs on a worker thread of the submission pool in create_resources_from_yaml.
+    kind and name come from the manifest, which create_resources_from_yaml has already validated.
+    """
+    try:
+        # Kinds we know are applied to their endpoint directly; anything else goes through
+        # kubernetes.utils.create_from_dict, which handles the API version and kind mapping itself.
+        if kind in APPLY_ENDPOINTS:
+            applied = _apply_resource(manifest, kind, name)
+            if kind == 'Deployment':
+                _record_applied_generation(name, applied.metadata.generation)
+        else:
+            utils.create_from_dict(api_client, manifest, namespace=NAMESPACE)
+        log.info(f"Successfully applied {kind} '{name}'.")
+        _track_created_resource(kind, name)
+
+    except ApiException as e:
+        log.error(f"Error applying {kind} '{name}': {e}")
+        raise # Re-raise the exception to terminate the job if creation fails unexpectedly
+    except Exception as e:
+        log.error(f"An unexpected error occurred while processing {kind} '{name}': {e}")
+        raise # Re-raise for general errors during creation
 
 def create_resources_from_yaml():
     """
     Reads the combined YAML file, creates all resources defined within it,
-    and stores their information for later deletion using kubernetes.utils.
+    and stores their information for later deletion.
+    A readiness watch on the first Deployment is opened just before that Deployment is submitted.
+    The creates are independent, so they are submitted concurrently to a thread pool
+    sharing the module-level ApiClient (and its urllib3 connection pool).
     """
-    global created_resources_info
+    global created_resources_info, deployment_watch
     created_resources_info = [] # Reset for each run
+    deployment_watch = None
 
-    print(f"Attempting to create resources from '{RESOURCES_YAML_PATH}' in namespace '{NAMESPACE}' using kubernetes.utils...")
+    log.info(f"Attempting to create resources from '{RESOURCES_YAML_PATH}' in namespace '{NAMESPACE}' using server-side apply...")
 
     try:
-        with open(RESOURCES_YAML_PATH, 'r') as f:
-            # yaml.safe_load_all() loads all YAML documents from the stream
-            manifests = list(yaml.safe_load_all(f)) # Load all manifests into a list first
-
-            for manifest in manifests:
+        # Open in binary mode so the raw bytes go straight to the parser, which detects
+        # the encoding and decodes them itself instead of going through Python's text layer
+        with open(RESOURCES_YAML_PATH, 'rb') as f, \
+             ThreadPoolExecutor(max_workers=MAX_CREATE_WORKERS) as executor:
+            futures = []
+            # yaml.load_all() with CSafeLoader yields YAML documents lazily from the stream,
+            # so each resource is submitted as soon as its document has been parsed.
+            # A parse error in a later document therefore surfaces after earlier resources were
+            # created; main() deletes whatever was tracked when that happens.
+            for manifest in yaml.load_all(f, Loader=CSafeLoader):
                 if not manifest: # Skip empty documents if any
                     continue
 
@@ -59,145 +211,363 @@ def create_resources_from_yaml():
                 name = manifest.get('metadata', {}).get('name')
 
                 if not kind or not name:
-                    print(f"Skipping malformed or incomplete manifest: {manifest}")
+                    log.warning(f"Skipping malformed or incomplete manifest: {manifest}")
                     continue
 
-                print(f"Processing {kind}: {name}...")
-
-                try:
-                    # Use kubernetes.utils.create_from_dict for more robust resource creation
-                    # It handles the API version and kind mapping automatically.
-                    # It returns the created Kubernetes object.
-                    # Note: create_from_dict can sometimes return a list if the manifest
-                    # itself contains multiple documents or is interpreted as such.
-                    created_obj_or_list = utils.create_from_dict(client.ApiClient(), manifest, namespace=NAMESPACE)
-
-                    # Handle both single object and list of objects returned by create_from_dict
-                    if isinstance(created_obj_or_list, list):
-                        for created_item in created_obj_or_list:
-                            if hasattr(created_item, 'kind') and hasattr(created_item, 'metadata') and hasattr(created_item.metadata, 'name'):
-                                actual_kind = created_item.kind
-                                actual_name = created_item.metadata.name
-                                print(f"Successfully created {actual_kind} '{actual_name}'.")
-                                created_resources_info.append({'kind': actual_kind, 'name': actual_name})
-                            else:
-                                print(f"Warning: Created item in list has unexpected structure. Cannot track for deletion: {created_item}")
-                    else: # Assume it's a single object
-                        created_obj = created_obj_or_list
-                        if hasattr(created_obj, 'kind') and hasattr(created_obj, 'metadata') and hasattr(created_obj.metadata, 'name'):
-                            actual_kind = created_obj.kind
-                            actual_name = created_obj.metadata.name
-                            print(f"Successfully created {actual_kind} '{actual_name}'.")
-                            created_resources_info.append({'kind': actual_kind, 'name': actual_name})
-                        else:
-                            print(f"Warning: Created object for {kind} '{name}' has unexpected structure. Cannot track for deletion.")
-                            # Fallback to original manifest's kind/name if object structure is unexpected
-                            created_resources_info.append({'kind': kind, 'name': name})
-
-                except ApiException as e:
-                    if e.status == 409: # Conflict, resource already exists
-                        print(f"Resource '{kind}' named '{name}' already exists. Skipping creation.")
-                        # Even if it exists, we still want to track it for deletion in this run
-                        created_resources_info.append({'kind': kind, 'name': name})
-                    else:
-                        print(f"Error creating {kind} '{name}': {e}")
-                        raise # Re-raise the exception to terminate the job if creation fails unexpectedly
-                except Exception as e:
-                    print(f"An unexpected error occurred while processing {kind} '{name}': {e}")
-                    raise # Re-raise for general errors during creation
+                log.info(f"Processing {kind}: {name}...")
+                if kind == 'Deployment' and deployment_watch is None:
+                    # Watch the first Deployment from before it is created, so its ADDED event and
+                    # every readiness update after it arrive on the one stream
+                    try:
+                        start_deployment_watch(name)
+                    except ApiException as e:
+                        log.warning(f"Could not open a watch for deployment '{name}' ahead of its creation: {e}")
+                futures.append(executor.submit(_create_resource, manifest, kind, name))
+
+            # Re-raise any creation failure so the job terminates, as the sequential loop did
+            for future in futures:
+                future.result()
 
     except FileNotFoundError:
-        print(f"Error: YAML file not found at '{RESOURCES_YAML_PATH}'.")
+        log.error(f"Error: YAML file not found at '{RESOURCES_YAML_PATH}'.")
         raise
     except yaml.YAMLError as e:
-        print(f"Error parsing YAML file '{RESOURCES_YAML_PATH}': {e}")
+        log.error(f"Error parsing YAML file '{RESOURCES_YAML_PATH}': {e}")
         raise
 
-def wait_for_deployment_ready():
+def is_deployment_ready(generation, observed_generation, replicas, ready_replicas):
     """
-    Identifies the deployment from the created_resources_info and waits for it to be ready.
-    Assumes there's at least one Deployment resource managed by this job.
+    Returns True once the deployment has processed its latest spec and all desired replicas are ready.
+    """
+    # Check if observedGeneration matches metadata.generation to ensure all updates are processed
+    # and if ready_replicas matches expected replicas.
+    return ready_replicas == replicas and generation == observed_generation
+
+def _open_deployment_watch(name, resource_version, timeout_seconds):
+    """
+    Opens a raw watch stream for a single deployment and returns the undecoded urllib3 response.
+    The caller owns the response and must close it.
+    """
+    query_params = [
+        ('watch', 'true'),
+        ('fieldSelector', f"metadata.name={name}"),
+        ('resourceVersion', resource_version),
+        # Bookmarks keep the resourceVersion fresh across quiet periods.
+        ('allowWatchBookmarks', 'true'),
+        ('timeoutSeconds', timeout_seconds),
+    ]
+    return api_client.call_api(
+        '/apis/apps/v1/namespaces/{namespace}/deployments', 'GET',
+        path_params={'namespace': NAMESPACE},
+        query_params=query_params,
+        header_params={'Accept': 'application/json'},
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True,
+        _preload_content=False,
+    )
+
+def _pick_watch_event_fields(raw_event):
+    """
+    Flattens a decoded watch event into a dict holding only the fields listed in WATCH_EVENT_FIELDS.
+    """
+    event = {}
+    for path, key in WATCH_EVENT_FIELDS.items():
+        value = raw_event
+        for part in path:
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is not None:
+            event[key] = value
+    return event
+
+def _iter_watch_events(response):
+    """
+    Yields one flat dict per watch event (see _pick_watch_event_fields).
+    The watch endpoint emits one JSON object per line, so each complete line is decoded with orjson
+    on its own and no V1Deployment objects are ever built.
+    """
+    pending = b''
+    for chunk in response.stream(WATCH_CHUNK_SIZE):
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield _pick_watch_event_fields(orjson.loads(line))
+    if pending.strip(): # Last event, if the stream ended without a trailing newline
+        yield _pick_watch_event_fields(orjson.loads(pending))
+
+def _deployment_state(deployment):
+    """
+    Returns the readiness fields of a V1Deployment returned by the typed API, keyed like a
+    flattened watch event (see _pick_watch_event_fields).
+    """
+    status = deployment.status
+    return {
+        'generation': deployment.metadata.generation,
+        'observed_generation': status.observed_generation if status else None,
+        'replicas': deployment.spec.replicas,
+        'ready_replicas': status.ready_replicas if status else None,
+    }
+
+def _is_watch_ready(watch):
     """
-    deployment_to_wait_for = None
+    Returns True once the latest state seen by a deployment watch is ready *and* belongs to at
+    least the generation this job applied, so a ready state left over from an earlier run does
+    not count before the apply has taken effect. Call with watch['cond'] held.
+    """
+    state = watch['latest']
+    min_generation = watch['min_generation']
+    if state is None or min_generation is None or (state.get('generation') or 0) < min_generation:
+        return False
+    return is_deployment_ready(state.get('generation'), state.get('observed_generation'),
+                               state.get('replicas'), state.get('ready_replicas'))
+
+def _update_deployment_watch(watch, **fields):
+    """
+    Updates fields of a deployment watch record and wakes anyone waiting on it.
+    Returns whether the watch is ready afterwards.
+    """
+    with watch['cond']:
+        watch.update(fields)
+        watch['cond'].notify_all()
+        return _is_watch_ready(watch)
+
+def _stop_deployment_watch(watch):
+    """
+    Stops a deployment watch: tells the watcher to exit and closes its open stream, so it doesn't
+    keep a pooled connection busy until the server-side timeout.
+    """
+    watch['stop_event'].set()
+    response = watch['response']
+    if response is not None:
+        response.close()
+
+def _watch_deployment(watch, resource_version):
+    """
+    Runs on a background thread: reads watch events for a single deployment from watch['response']
+    and records the latest state in watch['latest'], returning once _is_watch_ready holds.
+    The watch is resumed from the last seen resourceVersion whenever the stream ends before the
+    overall timeout, and restarted from a fresh read if that resourceVersion has expired (410 Gone).
+    Returns on readiness, on error, on timeout, or once stop_event is set, and marks the watch done.
+    """
+    name = watch['name']
+    stop_event = watch['stop_event']
+    deadline = time.monotonic() + WATCH_TIMEOUT_SECONDS
+    last_rv = resource_version
+    # (generation, observed_generation, ready_replicas) of the last event we evaluated
+    prev = (None, None, None)
+    try:
+        while not stop_event.is_set():
+            response = watch['response']
+            if response is None:
+                remaining = int(deadline - time.monotonic())
+                if remaining <= 0:
+                    return
+                response = watch['response'] = _open_deployment_watch(name, last_rv, remaining)
+                if stop_event.is_set(): # Stopped while we were reconnecting
+                    return
+            try:
+                for event in _iter_watch_events(response):
+                    if stop_event.is_set():
+                        return
+                    last_rv = event.get('resource_version') or last_rv
+                    if event.get('type') == 'BOOKMARK': # Carries only a resourceVersion, nothing to check
+                        continue
+                    if event.get('type') == 'ERROR':
+                        if event.get('code') != 410:
+                            log.warning(f"Watch for deployment '{name}' returned an error (code {event.get('code')}).")
+                            return
+                        # Our resourceVersion is too old to resume from; re-read the object to get a current one
+                        log.info(f"Watch for deployment '{name}' expired (410 Gone). Re-reading and resuming...")
+                        deployment = apps_v1.read_namespaced_deployment(name, NAMESPACE)
+                        if _update_deployment_watch(watch, latest=_deployment_state(deployment)):
+                            return
+                        last_rv = deployment.metadata.resource_version
+                        break
+                    # Status heartbeats (conditions, timestamps) that don't move these fields can't change readiness
+                    cur = (event.get('generation'), event.get('observed_generation'), event.get('ready_replicas'))
+                    if cur == prev:
+                        continue
+                    prev = cur
+                    if event.get('type') == 'ADDED' or event.get('type') == 'MODIFIED':
+                        if _update_deployment_watch(watch, latest=event):
+                            return
+                    # Provide more detailed status during the wait
+                    current_replicas = event.get('ready_replicas') or 0
+                    desired_replicas = event.get('replicas') if event.get('replicas') is not None else 'N/A'
+                    log.info(f"Deployment '{name}' not yet ready. Current status: {event.get('type', 'Unknown')}, Ready Replicas: {current_replicas}/{desired_replicas}")
+            finally:
+                response.close()
+                watch['response'] = None
+    except ApiException as e:
+        if not stop_event.is_set():
+            log.error(f"Kubernetes API error while watching deployment: {e}")
+    except Exception as e:
+        if not stop_event.is_set(): # Closing the stream from _stop_deployment_watch lands here
+            log.error(f"An unexpected error occurred while watching deployment '{name}': {e}")
+    finally:
+        _update_deployment_watch(watch, done=True)
+
+def _find_tracked_deployment():
+    """
+    Returns the name of the Deployment this job waits on: the one the early watch was opened for
+    (the first Deployment in the YAML file), or, if that watch couldn't be opened, the first
+    Deployment in created_resources_info. None if there is none.
+    created_resources_info is filled in the order creates finish, so it isn't consulted first.
+    """
+    if deployment_watch is not None:
+        return deployment_watch['name']
     for res_info in created_resources_info:
         if res_info['kind'] == 'Deployment':
-            deployment_to_wait_for = res_info['name']
-            break
+            return res_info['name']
+    return None
 
+def start_deployment_watch(name, resource_version='0', min_generation=None):
+    """
+    Opens a readiness watch on a single deployment and hands it to a background watcher thread.
+    The watch request is made here, on the calling thread, so that it is already established
+    when this returns: anything that happens to the deployment afterwards is seen by the watcher.
+    With the default resourceVersion of '0' the stream starts with the deployment's current state
+    (if it exists yet), so no separate read is needed. That state may predate this job's apply,
+    so readiness only counts from min_generation on; when the watch is opened ahead of the apply,
+    min_generation is filled in from the apply response (see _record_applied_generation).
+    """
+    global deployment_watch
+    if deployment_watch is not None:
+        _stop_deployment_watch(deployment_watch) # Don't leave an older watcher streaming
+    response = _open_deployment_watch(name, resource_version, WATCH_TIMEOUT_SECONDS)
+    watch = {
+        'name': name,
+        'cond': threading.Condition(),
+        'stop_event': threading.Event(),
+        'response': response,
+        'latest': None,
+        'min_generation': min_generation,
+        'done': False,
+    }
+    watch['thread'] = threading.Thread(target=_watch_deployment, args=(watch, resource_version), daemon=True)
+    watch['thread'].start()
+    deployment_watch = watch
+
+def _record_applied_generation(name, generation):
+    """
+    Tells the deployment watch (if it is watching name) which generation this job's apply produced.
+    """
+    watch = deployment_watch
+    if watch is not None and watch['name'] == name:
+        _update_deployment_watch(watch, min_generation=generation)
+
+def wait_for_deployment_ready():
+    """
+    Identifies the deployment from the created_resources_info and waits for it to be ready.
+    Assumes there's at least one Deployment resource managed by this job.
+    Reuses the watch opened before the deployment was created, if there is one.
+    """
+    deployment_to_wait_for = _find_tracked_deployment()
     if not deployment_to_wait_for:
-        print("No Deployment resource found in the YAML to wait for readiness. Skipping wait.")
+        log.info("No Deployment resource found in the YAML to wait for readiness. Skipping wait.")
         return
 
-    print(f"Waiting for deployment '{deployment_to_wait_for}' to be ready...")
-    w = Watch() # Changed to use the directly imported Watch class
+    log.info(f"Waiting for deployment '{deployment_to_wait_for}' to be ready...")
     try:
-        # Use a reasonable timeout for the watch stream (e.g., 10 minutes)
-        for event in w.stream(apps_v1.list_namespaced_deployment, namespace=NAMESPACE, field_selector=f"metadata.name={deployment_to_wait_for}", timeout_seconds=600):
-            if event['type'] == 'ADDED' or event['type'] == 'MODIFIED':
-                deployment = event['object']
-                # Check if observedGeneration matches metadata.generation to ensure all updates are processed
-                # and if ready_replicas matches expected replicas.
-                if deployment.status and \
-                   deployment.status.ready_replicas == deployment.spec.replicas and \
-                   deployment.metadata.generation == deployment.status.observed_generation:
-                    print(f"Deployment '{deployment_to_wait_for}' is ready.")
-                    w.stop()
-                    return
-            # Provide more detailed status during the wait
-            current_replicas = deployment.status.ready_replicas if deployment.status and deployment.status.ready_replicas is not None else 0
-            desired_replicas = deployment.spec.replicas if deployment.spec and deployment.spec.replicas is not None else 'N/A'
-            print(f"Deployment '{deployment_to_wait_for}' not yet ready. Current status: {event['type'] if 'type' in event else 'Unknown'}, Ready Replicas: {current_replicas}/{desired_replicas}")
-        print(f"Timeout waiting for deployment '{deployment_to_wait_for}' to be ready.")
+        if deployment_watch is None or deployment_watch['name'] != deployment_to_wait_for:
+            # No watch was opened ahead of the create: read the single object once, and if it is
+            # not ready yet, watch from the resourceVersion we just read, so the apiserver only
+            # sends changes after that point. The apply has already happened, so the generation
+            # we read is the one to wait for.
+            deployment = apps_v1.read_namespaced_deployment(deployment_to_wait_for, NAMESPACE)
+            state = _deployment_state(deployment)
+            if is_deployment_ready(state['generation'], state['observed_generation'],
+                                   state['replicas'], state['ready_replicas']):
+                log.info(f"Deployment '{deployment_to_wait_for}' is ready.")
+                return
+            start_deployment_watch(deployment_to_wait_for, deployment.metadata.resource_version,
+                                   min_generation=deployment.metadata.generation)
+
+        watch = deployment_watch
+        with watch['cond']:
+            # Also returns early if the watcher gives up on an error or the watch times out
+            ready = watch['cond'].wait_for(lambda: watch['done'] or _is_watch_ready(watch),
+                                           timeout=WATCH_TIMEOUT_SECONDS) and _is_watch_ready(watch)
+        if ready:
+            log.info(f"Deployment '{deployment_to_wait_for}' is ready.")
+        else:
+            log.warning(f"Timeout waiting for deployment '{deployment_to_wait_for}' to be ready.")
     except ApiException as e:
-        print(f"Kubernetes API error while waiting for deployment: {e}")
+        log.error(f"Kubernetes API error while waiting for deployment: {e}")
     except Exception as e:
-        print(f"An unexpected error occurred while waiting for deployment readiness: {e}")
+        log.error(f"An unexpected error occurred while waiting for deployment readiness: {e}")
     finally:
-        w.stop() # Ensure the watch is stopped even on error or timeout
+        if deployment_watch is not None:
+            _stop_deployment_watch(deployment_watch) # Ensure the watcher stops even on error or timeout
 
-def delete_created_resources():
+def confirm_deployment_available():
     """
-    Deletes all resources that were previously created and tracked by this job.
-    Deletes in reverse order of creation, which can sometimes help with dependencies.
-    """
-    print("Attempting to delete created resources...")
-    # Iterate in reverse to delete dependents first (e.g., Deployment before Service in some cases)
-    # However, for simple Deployment/Service, order often doesn't strictly matter for deletion.
-    for resource_info in reversed(created_resources_info):
-        kind = resource_info['kind']
-        name = resource_info['name']
-        print(f"Deleting {kind} '{name}' from namespace '{NAMESPACE}'...")
+    Confirms that every replica of the tracked deployment is available before tear-down.
+    Polls the deployment (covered by the Role's get verb) a few times with a short jittered delay instead of sleeping a fixed period.
+    """
+    deployment_name = _find_tracked_deployment()
+    if not deployment_name:
+        return
+
+    for attempt in range(1, SETTLE_MAX_ATTEMPTS + 1):
         try:
-            # Use kubernetes.utils.delete_from_dict for more robust resource deletion
-            # This requires the full manifest, but we only have kind/name.
-            # So, we'll stick to direct API calls for deletion, which is fine.
-            if kind == 'Deployment':
-                apps_v1.delete_namespaced_deployment(
-                    name=name,
-                    namespace=NAMESPACE,
-                    body=client.V1DeleteOptions(propagation_policy="Foreground", grace_period_seconds=5)
-                )
-                print(f"Deployment '{name}' deletion initiated.")
-            elif kind == 'Service':
-                core_v1.delete_namespaced_service(
-                    name=name,
-                    namespace=NAMESPACE,
-                    body=client.V1DeleteOptions(propagation_policy="Foreground", grace_period_seconds=5)
-                )
-                print(f"Service '{name}' deletion initiated.")
-            else:
-                print(f"Skipping deletion for unsupported resource kind '{kind}'.")
+            deployment = apps_v1.read_namespaced_deployment(deployment_name, NAMESPACE)
+            available_replicas = (deployment.status.available_replicas if deployment.status else None) or 0
+            if available_replicas == deployment.spec.replicas:
+                log.info(f"Deployment '{deployment_name}' has all {available_replicas} replicas available.")
+                return
+            log.info(f"Deployment '{deployment_name}' has {available_replicas}/{deployment.spec.replicas} replicas available (attempt {attempt}/{SETTLE_MAX_ATTEMPTS}).")
         except ApiException as e:
-            if e.status == 404: # Not Found, resource already gone
-                print(f"Resource '{kind}' named '{name}' not found. Skipping deletion.")
-            else:
-                print(f"Error deleting {kind} '{name}': {e}")
-                # Don't re-raise, try to delete other resources even if one fails
+            log.error(f"Kubernetes API error while checking deployment availability: {e}")
+        if attempt < SETTLE_MAX_ATTEMPTS:
+            time.sleep(SETTLE_RETRY_SECONDS * random.uniform(0.5, 1.5))
+    log.warning(f"Deployment '{deployment_name}' did not report all replicas available. Continuing with deletion.")
+
+def _delete_resource(kind, name):
+    """
+    Deletes a single tracked resource. Runs on a worker thread of the pool in delete_created_resources.
+    """
+    log.info(f"Deleting {kind} '{name}' from namespace '{NAMESPACE}'...")
+    try:
+        # Use kubernetes.utils.delete_from_dict for more robust resource deletion
+        # This requires the full manifest, but we only have kind/name.
+        # So, we'll stick to direct API calls for deletion, which is fine.
+        delete_fn, delete_opts = DELETE_DISPATCH.get(kind, (None, None))
+        if delete_fn:
+            delete_fn(name=name, namespace=NAMESPACE, body=delete_opts)
+            log.info(f"{kind} '{name}' deletion initiated.")
+        else:
+            log.warning(f"Skipping deletion for unsupported resource kind '{kind}'.")
+    except ApiException as e:
+        if e.status == 404: # Not Found, resource already gone
+            log.info(f"Resource '{kind}' named '{name}' not found. Skipping deletion.")
+        else:
+            log.error(f"Error deleting {kind} '{name}': {e}")
+            # Don't re-raise, try to delete other resources even if one fails
+
+def delete_created_resources():
+    """
+    Deletes all resources that were previously created and tracked by this job.
+    The tracked resources are independent top-level objects, so their deletes are issued concurrently.
+    """
+    log.info("Attempting to delete created resources...")
+    if not created_resources_info:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(created_resources_info)) as executor:
+        futures = [executor.submit(_delete_resource, resource_info['kind'], resource_info['name'])
+                   for resource_info in created_resources_info]
+        wait(futures, return_when=ALL_COMPLETED)
+
+    # Re-raise any unexpected (non-API) error so the job still fails as it did before
+    for future in futures:
+        future.result()
 
 def main():
     """
     Main function to orchestrate the job's tasks.
     """
+    deletion_started = False
     try:
         # 1. Create resources (Deployment and Service) from the combined YAML
         create_resources_from_yaml()
@@ -205,21 +575,30 @@ def main():
         # 2. Wait for the specific deployment to be ready
         wait_for_deployment_ready()
 
-        # 3. Wait for 60 seconds
-        print(f"Waiting for {WAIT_SECONDS} seconds...")
-        time.sleep(WAIT_SECONDS)
-        print("Wait complete.")
+        # 3. Confirm the deployment has settled (all replicas available)
+        confirm_deployment_available()
 
         # 4. Delete all the created resources (Deployment and Service)
+        deletion_started = True
         delete_created_resources()
 
         # 5. Terminate the job
-        print("Job completed successfully. Terminating.")
+        log.info("Job completed successfully. Terminating.")
 
     except Exception as e:
-        print(f"An error occurred during job execution: {e}")
-        # Exit with a non-zero status code to indicate failure
-        os._exit(1)
+        log.error(f"An error occurred during job execution: {e}")
+        # Manifests are parsed and submitted one document at a time, so a failure part-way through
+        # (e.g. a YAML error in a later document) can leave earlier resources already created.
+        # Tear down whatever this run tracked so they aren't left behind, unless the failure came
+        # from step 4 itself, which has already sent every delete.
+        if created_resources_info and not deletion_started:
+            try:
+                delete_created_resources()
+            except Exception as cleanup_error:
+                log.error(f"An error occurred while cleaning up after the failure: {cleanup_error}")
+        # Close the API connections cleanly and exit with a non-zero status code to indicate failure
+        _close_api_client()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()